@@ -1,7 +1,10 @@
 import json
+import logging
 from typing import Dict
 from openai import OpenAI, APIConnectionError, APIError
 
+logger = logging.getLogger('trading')
+
 class AITrader:
     def __init__(self, api_key: str, api_url: str, model_name: str):
         self.api_key = api_key
@@ -115,17 +118,15 @@ Analyze and output JSON only.
             
         except APIConnectionError as e:
             error_msg = f"API connection failed: {str(e)}"
-            print(f"[ERROR] {error_msg}")
+            logger.error(f"[ERROR] {error_msg}")
             raise Exception(error_msg)
         except APIError as e:
             error_msg = f"API error ({e.status_code}): {e.message}"
-            print(f"[ERROR] {error_msg}")
+            logger.error(f"[ERROR] {error_msg}")
             raise Exception(error_msg)
         except Exception as e:
             error_msg = f"LLM call failed: {str(e)}"
-            print(f"[ERROR] {error_msg}")
-            import traceback
-            print(traceback.format_exc())
+            logger.exception(f"[ERROR] {error_msg}")
             raise Exception(error_msg)
     
     def _parse_response(self, response: str) -> Dict:
@@ -140,6 +141,6 @@ Analyze and output JSON only.
             decisions = json.loads(response.strip())
             return decisions
         except json.JSONDecodeError as e:
-            print(f"[ERROR] JSON parse failed: {e}")
-            print(f"[DATA] Response:\n{response}")
+            logger.error(f"[ERROR] JSON parse failed: {e}")
+            logger.info(f"[DATA] Response:\n{response}")
             return {}
@@ -1,7 +1,19 @@
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, Response, render_template, request
 from flask_cors import CORS
+from waitress import serve
+import orjson
+import requests
+from requests.adapters import HTTPAdapter
+import atexit
+import sys
 import time
+import queue
 import threading
+import uuid
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 
 from trading_engine import TradingEngine
@@ -12,11 +24,74 @@ from database import Database
 app = Flask(__name__)
 CORS(app)
 
-db = Database('trading_bot.db')
-market_fetcher = MarketDataFetcher()
+def ojsonify(obj):
+    """JSON response serialized with orjson (also handles NumPy values)"""
+    return Response(orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY),
+                    mimetype='application/json')
+
+# Worker threads only enqueue log records; a single listener thread writes them.
+# Started here so logs flow however the app is hosted (python app.py, a WSGI
+# server, tests). The bound caps memory if stdout ever stalls.
+_log_queue = queue.Queue(maxsize=10000)
+logger = logging.getLogger('trading')
+logger.setLevel(logging.INFO)
+logger.addHandler(QueueHandler(_log_queue))
+logger.propagate = False
+log_listener = QueueListener(_log_queue, logging.StreamHandler(sys.stdout))
+log_listener.start()
+atexit.register(log_listener.stop)
+
+# Pool sized to match the server threads
+db = Database('trading_bot.db', pool_size=16)
+# One keep-alive session for all market data requests, sized for the
+# concurrent trading cycles
+http_session = requests.Session()
+http_session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+market_fetcher = MarketDataFetcher(session=http_session)
 trading_engines = {}
 auto_trading = True
 
+COINS = ['BTC', 'ETH', 'SOL', 'BNB', 'XRP', 'DOGE']
+
+# Manual execution jobs, run off the request thread
+JOB_WORKERS = 4
+MAX_JOB_RESULTS = 256
+
+job_queue = queue.Queue(maxsize=64)
+job_results = OrderedDict()
+_job_lock = threading.Lock()
+
+def _set_job_state(job_id, state):
+    with _job_lock:
+        job_results[job_id] = state
+        job_results.move_to_end(job_id)
+        while len(job_results) > MAX_JOB_RESULTS:
+            job_results.popitem(last=False)
+
+def job_worker():
+    while True:
+        job_id, model_id = job_queue.get()
+        _set_job_state(job_id, {'status': 'running', 'model_id': model_id})
+        try:
+            engine = trading_engines.get(model_id)
+            if engine is None:
+                state = {'status': 'error', 'model_id': model_id, 'error': 'Model not found'}
+            else:
+                result = engine.execute_trading_cycle()
+                state = {'status': 'done', 'model_id': model_id, 'result': result}
+        except Exception as e:
+            logger.error(f"[ERROR] Job {job_id} (Model {model_id}) failed: {e}")
+            state = {'status': 'error', 'model_id': model_id, 'error': str(e)}
+        _set_job_state(job_id, state)
+        job_queue.task_done()
+
+# Models run their cycles concurrently; each cycle mostly waits on the AI API
+_cycle_pool = ThreadPoolExecutor(max_workers=16, thread_name_prefix='trade')
+
+def start_job_workers():
+    for i in range(JOB_WORKERS):
+        threading.Thread(target=job_worker, name=f'job-{i}', daemon=True).start()
+
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -24,7 +99,7 @@ def index():
 @app.route('/api/models', methods=['GET'])
 def get_models():
     models = db.get_all_models()
-    return jsonify(models)
+    return ojsonify(models)
 
 @app.route('/api/models', methods=['POST'])
 def add_model():
@@ -49,11 +124,64 @@ def add_model():
                 model_name=model['model_name']
             )
         )
-        print(f"[INFO] Model {model_id} ({data['name']}) initialized")
+        logger.info(f"[INFO] Model {model_id} ({data['name']}) initialized")
     except Exception as e:
-        print(f"[ERROR] Model {model_id} initialization failed: {e}")
+        logger.error(f"[ERROR] Model {model_id} initialization failed: {e}")
+    
+    return ojsonify({'id': model_id, 'message': 'Model added successfully'})
+
+@app.route('/api/models/<int:model_id>', methods=['PUT'])
+def update_model(model_id):
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return ojsonify({'error': 'Request body must be a JSON object'}), 400
+
+    # Omitted fields are left unchanged, but a blank value would erase a required setting
+    for field in ('name', 'api_key', 'api_url', 'model_name'):
+        value = data.get(field)
+        if value is not None and not (isinstance(value, str) and value.strip()):
+            return ojsonify({'error': f'{field} must be a non-empty string'}), 400
+
+    initial_capital = data.get('initial_capital')
+    if initial_capital is not None:
+        try:
+            initial_capital = float(initial_capital)
+        except (TypeError, ValueError):
+            return ojsonify({'error': 'initial_capital must be a number'}), 400
+        # Returns are computed relative to initial capital
+        if not initial_capital > 0:
+            return ojsonify({'error': 'initial_capital must be positive'}), 400
     
-    return jsonify({'id': model_id, 'message': 'Model added successfully'})
+    updated = db.update_model(
+        model_id,
+        name=data.get('name'),
+        api_key=data.get('api_key'),
+        api_url=data.get('api_url'),
+        model_name=data.get('model_name'),
+        initial_capital=initial_capital
+    )
+    if not updated:
+        return ojsonify({'error': 'Model not found'}), 404
+    
+    # Rebuild the engine so new API settings take effect on the next cycle
+    model = db.get_model(model_id)
+    if not model:
+        # Deleted between the update and this read
+        trading_engines.pop(model_id, None)
+        return ojsonify({'error': 'Model not found'}), 404
+
+    trading_engines[model_id] = TradingEngine(
+        model_id=model_id,
+        db=db,
+        market_fetcher=market_fetcher,
+        ai_trader=AITrader(
+            api_key=model['api_key'],
+            api_url=model['api_url'],
+            model_name=model['model_name']
+        )
+    )
+    logger.info(f"[INFO] Model {model_id} ({model['name']}) updated")
+    return ojsonify({'message': 'Model updated successfully'})
 
 @app.route('/api/models/<int:model_id>', methods=['DELETE'])
 def delete_model(model_id):
@@ -65,21 +193,21 @@ def delete_model(model_id):
         if model_id in trading_engines:
             del trading_engines[model_id]
         
-        print(f"[INFO] Model {model_id} ({model_name}) deleted")
-        return jsonify({'message': 'Model deleted successfully'})
+        logger.info(f"[INFO] Model {model_id} ({model_name}) deleted")
+        return ojsonify({'message': 'Model deleted successfully'})
     except Exception as e:
-        print(f"[ERROR] Delete model {model_id} failed: {e}")
-        return jsonify({'error': str(e)}), 500
+        logger.error(f"[ERROR] Delete model {model_id} failed: {e}")
+        return ojsonify({'error': str(e)}), 500
 
 @app.route('/api/models/<int:model_id>/portfolio', methods=['GET'])
 def get_portfolio(model_id):
-    prices_data = market_fetcher.get_current_prices(['BTC', 'ETH', 'SOL', 'BNB', 'XRP', 'DOGE'])
+    prices_data = market_fetcher.get_current_prices(COINS)
     current_prices = {coin: prices_data[coin]['price'] for coin in prices_data}
     
     portfolio = db.get_portfolio(model_id, current_prices)
     account_value = db.get_account_value_history(model_id, limit=100)
     
-    return jsonify({
+    return ojsonify({
         'portfolio': portfolio,
         'account_value_history': account_value
     })
@@ -88,26 +216,26 @@ def get_portfolio(model_id):
 def get_trades(model_id):
     limit = request.args.get('limit', 50, type=int)
     trades = db.get_trades(model_id, limit=limit)
-    return jsonify(trades)
+    return ojsonify(trades)
 
 @app.route('/api/models/<int:model_id>/conversations', methods=['GET'])
 def get_conversations(model_id):
     limit = request.args.get('limit', 20, type=int)
-    conversations = db.get_conversations(model_id, limit=limit)
-    return jsonify(conversations)
+    summary = request.args.get('summary', 0, type=int)
+    conversations = db.get_conversations(model_id, limit=limit, full=not summary)
+    return ojsonify(conversations)
 
 @app.route('/api/market/prices', methods=['GET'])
 def get_market_prices():
-    coins = ['BTC', 'ETH', 'SOL', 'BNB', 'XRP', 'DOGE']
-    prices = market_fetcher.get_current_prices(coins)
-    return jsonify(prices)
+    prices = market_fetcher.get_current_prices(COINS)
+    return ojsonify(prices)
 
 @app.route('/api/models/<int:model_id>/execute', methods=['POST'])
 def execute_trading(model_id):
     if model_id not in trading_engines:
         model = db.get_model(model_id)
         if not model:
-            return jsonify({'error': 'Model not found'}), 404
+            return ojsonify({'error': 'Model not found'}), 404
         
         trading_engines[model_id] = TradingEngine(
             model_id=model_id,
@@ -120,14 +248,27 @@ def execute_trading(model_id):
             )
         )
     
+    job_id = uuid.uuid4().hex
+    _set_job_state(job_id, {'status': 'queued', 'model_id': model_id})
     try:
-        result = trading_engines[model_id].execute_trading_cycle()
-        return jsonify(result)
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+        job_queue.put_nowait((job_id, model_id))
+    except queue.Full:
+        with _job_lock:
+            job_results.pop(job_id, None)
+        return ojsonify({'error': 'Too many pending jobs'}), 503
+    
+    return ojsonify({'job_id': job_id, 'status': 'queued'}), 202
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    with _job_lock:
+        state = job_results.get(job_id)
+    if state is None:
+        return ojsonify({'error': 'Job not found'}), 404
+    return ojsonify({'job_id': job_id, **state})
 
 def trading_loop():
-    print("[INFO] Trading loop started")
+    logger.info("[INFO] Trading loop started")
     
     while auto_trading:
         try:
@@ -135,61 +276,79 @@ def trading_loop():
                 time.sleep(30)
                 continue
             
-            print(f"\n{'='*60}")
-            print(f"[CYCLE] {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            print(f"[INFO] Active models: {len(trading_engines)}")
-            print(f"{'='*60}")
+            logger.info(f"\n{'='*60}")
+            logger.info(f"[CYCLE] {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+            logger.info(f"[INFO] Active models: {len(trading_engines)}")
+            logger.info(f"{'='*60}")
             
+            futures = {}
             for model_id, engine in list(trading_engines.items()):
+                logger.info(f"[EXEC] Model {model_id}")
+                futures[_cycle_pool.submit(
+                    engine.execute_trading_cycle, record_account_value=False
+                )] = model_id
+            
+            account_values = []
+            for future in as_completed(futures):
+                model_id = futures[future]
                 try:
-                    print(f"\n[EXEC] Model {model_id}")
-                    result = engine.execute_trading_cycle()
+                    result = future.result()
                     
                     if result.get('success'):
-                        print(f"[OK] Model {model_id} completed")
+                        portfolio = result['portfolio']
+                        account_values.append((
+                            model_id,
+                            portfolio['total_value'],
+                            portfolio['cash'],
+                            portfolio['positions_value']
+                        ))
+                        logger.info(f"\n[OK] Model {model_id} completed")
                         if result.get('executions'):
                             for exec_result in result['executions']:
                                 signal = exec_result.get('signal', 'unknown')
                                 coin = exec_result.get('coin', 'unknown')
                                 msg = exec_result.get('message', '')
                                 if signal != 'hold':
-                                    print(f"  [TRADE] {coin}: {msg}")
+                                    logger.info(f"  [TRADE] {coin}: {msg}")
                     else:
                         error = result.get('error', 'Unknown error')
-                        print(f"[WARN] Model {model_id} failed: {error}")
+                        logger.warning(f"\n[WARN] Model {model_id} failed: {error}")
                         
                 except Exception as e:
-                    print(f"[ERROR] Model {model_id} exception: {e}")
-                    import traceback
-                    print(traceback.format_exc())
+                    logger.exception(f"\n[ERROR] Model {model_id} exception: {e}")
                     continue
             
-            print(f"\n{'='*60}")
-            print(f"[SLEEP] Waiting 3 minutes for next cycle")
-            print(f"{'='*60}\n")
+            # One commit for every model's snapshot in this cycle, skipping
+            # models deleted while their cycle was running
+            try:
+                db.record_account_values(
+                    [row for row in account_values if row[0] in trading_engines]
+                )
+            except Exception as e:
+                logger.error(f"[ERROR] Record account values failed: {e}")
+            
+            logger.info(f"\n{'='*60}")
+            logger.info(f"[SLEEP] Waiting 3 minutes for next cycle")
+            logger.info(f"{'='*60}\n")
             
             time.sleep(180)
             
         except Exception as e:
-            print(f"\n[CRITICAL] Trading loop error: {e}")
-            import traceback
-            print(traceback.format_exc())
-            print("[RETRY] Retrying in 60 seconds\n")
+            logger.critical(f"\n[CRITICAL] Trading loop error: {e}", exc_info=True)
+            logger.info("[RETRY] Retrying in 60 seconds\n")
             time.sleep(60)
     
-    print("[INFO] Trading loop stopped")
+    logger.info("[INFO] Trading loop stopped")
 
 @app.route('/api/leaderboard', methods=['GET'])
 def get_leaderboard():
-    models = db.get_all_models()
     leaderboard = []
     
-    prices_data = market_fetcher.get_current_prices(['BTC', 'ETH', 'SOL', 'BNB', 'XRP', 'DOGE'])
+    prices_data = market_fetcher.get_current_prices(COINS)
     current_prices = {coin: prices_data[coin]['price'] for coin in prices_data}
     
-    for model in models:
-        portfolio = db.get_portfolio(model['id'], current_prices)
-        account_value = portfolio.get('total_value', model['initial_capital'])
+    for model in db.get_leaderboard_rows(current_prices):
+        account_value = model['total_value']
         returns = ((account_value - model['initial_capital']) / model['initial_capital']) * 100
         
         leaderboard.append({
@@ -201,17 +360,17 @@ def get_leaderboard():
         })
     
     leaderboard.sort(key=lambda x: x['returns'], reverse=True)
-    return jsonify(leaderboard)
+    return ojsonify(leaderboard)
 
 def init_trading_engines():
     try:
         models = db.get_all_models()
         
         if not models:
-            print("[WARN] No trading models found")
+            logger.warning("[WARN] No trading models found")
             return
         
-        print(f"\n[INIT] Initializing trading engines...")
+        logger.info(f"\n[INIT] Initializing trading engines...")
         for model in models:
             model_id = model['id']
             model_name = model['name']
@@ -227,33 +386,41 @@ def init_trading_engines():
                         model_name=model['model_name']
                     )
                 )
-                print(f"  [OK] Model {model_id} ({model_name})")
+                logger.info(f"  [OK] Model {model_id} ({model_name})")
             except Exception as e:
-                print(f"  [ERROR] Model {model_id} ({model_name}): {e}")
+                logger.error(f"  [ERROR] Model {model_id} ({model_name}): {e}")
                 continue
         
-        print(f"[INFO] Initialized {len(trading_engines)} engine(s)\n")
+        logger.info(f"[INFO] Initialized {len(trading_engines)} engine(s)\n")
         
     except Exception as e:
-        print(f"[ERROR] Init engines failed: {e}\n")
+        logger.error(f"[ERROR] Init engines failed: {e}\n")
 
 if __name__ == '__main__':
     db.init_db()
     
-    print("\n" + "=" * 60)
-    print("AI Trading Platform")
-    print("=" * 60)
+    logger.info("\n" + "=" * 60)
+    logger.info("AI Trading Platform")
+    logger.info("=" * 60)
     
     init_trading_engines()
+    start_job_workers()
     
     if auto_trading:
         trading_thread = threading.Thread(target=trading_loop, daemon=True)
         trading_thread.start()
-        print("[INFO] Auto-trading enabled")
+        logger.info("[INFO] Auto-trading enabled")
     
-    print("\n" + "=" * 60)
-    print("Server: http://localhost:5000")
-    print("Press Ctrl+C to stop")
-    print("=" * 60 + "\n")
+    logger.info("\n" + "=" * 60)
+    logger.info("Server: http://localhost:5000")
+    logger.info("Press Ctrl+C to stop")
+    logger.info("=" * 60 + "\n")
     
-    app.run(debug=False, host='0.0.0.0', port=5000, use_reloader=False)
+    try:
+        # Production WSGI server; threads sized for concurrent dashboard polls
+        # and I/O-bound handlers
+        serve(app, host='0.0.0.0', port=5000, threads=16)
+    finally:
+        market_fetcher.close()
+        db.close_all()
+
@@ -3,98 +3,276 @@ Database management module
 """
 import sqlite3
 import json
+import queue
+import threading
 from datetime import datetime
+from itertools import groupby
+from operator import itemgetter
 from typing import List, Dict, Optional
 
+import numpy as np
+
+from portfolio_math import calculate_position_pnl
+
+# ============ SQL Statements ============
+
+_SQL_ADD_MODEL = '''
+    INSERT INTO models (name, api_key, api_url, model_name, initial_capital)
+    VALUES (?, ?, ?, ?, ?)
+'''
+
+_SQL_GET_MODEL = 'SELECT * FROM models WHERE id = ?'
+
+_SQL_GET_ALL_MODELS = 'SELECT * FROM models ORDER BY created_at DESC'
+
+# Columns update_model may change; the SET clause is built from these names only
+_MODEL_UPDATE_COLUMNS = ('name', 'api_key', 'api_url', 'model_name', 'initial_capital')
+
+# Children first, the models row last
+_SQL_DELETE_MODEL = (
+    'DELETE FROM portfolios WHERE model_id = ?',
+    'DELETE FROM trades WHERE model_id = ?',
+    'DELETE FROM conversations WHERE model_id = ?',
+    'DELETE FROM account_values WHERE model_id = ?',
+    'DELETE FROM models WHERE id = ?',
+)
+
+_SQL_UPDATE_POSITION = '''
+    INSERT INTO portfolios (model_id, coin, quantity, avg_price, leverage, side, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+    ON CONFLICT(model_id, coin, side) DO UPDATE SET
+        quantity = excluded.quantity,
+        avg_price = excluded.avg_price,
+        leverage = excluded.leverage,
+        updated_at = CURRENT_TIMESTAMP
+'''
+
+_SQL_GET_POSITIONS = '''
+    SELECT * FROM portfolios WHERE model_id = ? AND quantity > 0
+'''
+
+_SQL_GET_CAPITAL_AND_REALIZED_PNL = '''
+    SELECT initial_capital, realized_pnl AS total_pnl FROM models WHERE id = ?
+'''
+
+_SQL_GET_LEADERBOARD_MODELS = '''
+    SELECT id, name, initial_capital, realized_pnl FROM models
+'''
+
+_SQL_GET_OPEN_POSITIONS = '''
+    SELECT * FROM portfolios WHERE quantity > 0 ORDER BY model_id
+'''
+
+_SQL_CLOSE_POSITION = '''
+    DELETE FROM portfolios WHERE model_id = ? AND coin = ? AND side = ?
+'''
+
+_SQL_ADD_TRADE = '''
+    INSERT INTO trades (model_id, coin, signal, quantity, price, leverage, side, pnl)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+_SQL_ADD_REALIZED_PNL = '''
+    UPDATE models SET realized_pnl = realized_pnl + ? WHERE id = ?
+'''
+
+_SQL_GET_TRADES = '''
+    SELECT id, coin, signal, quantity, price, leverage, side, pnl, timestamp
+    FROM trades WHERE model_id = ?
+    ORDER BY id DESC LIMIT ?
+'''
+
+_SQL_ADD_CONVERSATION = '''
+    INSERT INTO conversations (model_id, user_prompt, ai_response, cot_trace)
+    VALUES (?, ?, ?, ?)
+'''
+
+_SQL_GET_CONVERSATIONS_FULL = '''
+    SELECT id, user_prompt, ai_response, cot_trace, timestamp
+    FROM conversations WHERE model_id = ?
+    ORDER BY id DESC LIMIT ?
+'''
+
+_SQL_GET_CONVERSATIONS_SUMMARY = '''
+    SELECT id, substr(ai_response, 1, 500) AS ai_response_preview, timestamp
+    FROM conversations WHERE model_id = ?
+    ORDER BY id DESC LIMIT ?
+'''
+
+_SQL_RECORD_ACCOUNT_VALUE = '''
+    INSERT INTO account_values (model_id, total_value, cash, positions_value)
+    VALUES (?, ?, ?, ?)
+'''
+
+_SQL_GET_ACCOUNT_VALUE_HISTORY = '''
+    SELECT id, total_value, cash, positions_value, timestamp
+    FROM account_values WHERE model_id = ?
+    ORDER BY id DESC LIMIT ?
+'''
+
 class Database:
-    def __init__(self, db_path: str = 'trading_bot.db'):
+    def __init__(self, db_path: str = 'trading_bot.db', pool_size: int = 8):
         self.db_path = db_path
+        # Idle connections, reused LIFO so the most recently used (hottest
+        # page cache) connection is handed out first
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        # Model rows by id; they only change through this class
+        self._model_cache = {}
+        # Bumped on every invalidation so a slow cache miss can't store a stale row
+        self._model_generation = {}
+        self._model_cache_lock = threading.Lock()
         
-    def get_connection(self):
-        """Get database connection"""
-        conn = sqlite3.connect(self.db_path)
+    def _create_connection(self):
+        """Open a new connection and apply per-connection PRAGMAs"""
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
         conn.row_factory = sqlite3.Row
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        conn.execute('PRAGMA mmap_size=268435456')
+        conn.execute('PRAGMA cache_size=-64000')
+        conn.execute('PRAGMA foreign_keys=ON')
+        conn.execute('PRAGMA wal_autocheckpoint=1000')
         return conn
     
+    def get_connection(self):
+        """Get database connection from the pool"""
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._create_connection()
+    
+    def release_connection(self, conn):
+        """Return connection to the pool"""
+        # Never hand out a connection with a half-finished transaction
+        if conn.in_transaction:
+            conn.rollback()
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+    
+    def close_all(self):
+        """Close all pooled connections"""
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+    
     def init_db(self):
         """Initialize database tables"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Models table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS models (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                api_key TEXT NOT NULL,
-                api_url TEXT NOT NULL,
-                model_name TEXT NOT NULL,
-                initial_capital REAL DEFAULT 10000,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Portfolios table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS portfolios (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                model_id INTEGER NOT NULL,
-                coin TEXT NOT NULL,
-                quantity REAL NOT NULL,
-                avg_price REAL NOT NULL,
-                leverage INTEGER DEFAULT 1,
-                side TEXT DEFAULT 'long',
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (model_id) REFERENCES models(id),
-                UNIQUE(model_id, coin, side)
-            )
-        ''')
-        
-        # Trades table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS trades (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                model_id INTEGER NOT NULL,
-                coin TEXT NOT NULL,
-                signal TEXT NOT NULL,
-                quantity REAL NOT NULL,
-                price REAL NOT NULL,
-                leverage INTEGER DEFAULT 1,
-                side TEXT DEFAULT 'long',
-                pnl REAL DEFAULT 0,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (model_id) REFERENCES models(id)
-            )
-        ''')
-        
-        # Conversations table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS conversations (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                model_id INTEGER NOT NULL,
-                user_prompt TEXT NOT NULL,
-                ai_response TEXT NOT NULL,
-                cot_trace TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (model_id) REFERENCES models(id)
-            )
-        ''')
-        
-        # Account values history table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS account_values (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                model_id INTEGER NOT NULL,
-                total_value REAL NOT NULL,
-                cash REAL NOT NULL,
-                positions_value REAL NOT NULL,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (model_id) REFERENCES models(id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            
+            # WAL is persistent at the file level, so enable it once here
+            cursor.execute('PRAGMA journal_mode=WAL')
+            
+            # Models table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS models (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    api_key TEXT NOT NULL,
+                    api_url TEXT NOT NULL,
+                    model_name TEXT NOT NULL,
+                    initial_capital REAL DEFAULT 10000,
+                    realized_pnl REAL DEFAULT 0,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            
+            # Portfolios table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS portfolios (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    model_id INTEGER NOT NULL,
+                    coin TEXT NOT NULL,
+                    quantity REAL NOT NULL,
+                    avg_price REAL NOT NULL,
+                    leverage INTEGER DEFAULT 1,
+                    side TEXT DEFAULT 'long',
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (model_id) REFERENCES models(id) ON DELETE CASCADE,
+                    UNIQUE(model_id, coin, side)
+                )
+            ''')
+            
+            # Trades table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS trades (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    model_id INTEGER NOT NULL,
+                    coin TEXT NOT NULL,
+                    signal TEXT NOT NULL,
+                    quantity REAL NOT NULL,
+                    price REAL NOT NULL,
+                    leverage INTEGER DEFAULT 1,
+                    side TEXT DEFAULT 'long',
+                    pnl REAL DEFAULT 0,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (model_id) REFERENCES models(id) ON DELETE CASCADE
+                )
+            ''')
+            
+            # Conversations table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS conversations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    model_id INTEGER NOT NULL,
+                    user_prompt TEXT NOT NULL,
+                    ai_response TEXT NOT NULL,
+                    cot_trace TEXT,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (model_id) REFERENCES models(id) ON DELETE CASCADE
+                )
+            ''')
+            
+            # Account values history table
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS account_values (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    model_id INTEGER NOT NULL,
+                    total_value REAL NOT NULL,
+                    cash REAL NOT NULL,
+                    positions_value REAL NOT NULL,
+                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (model_id) REFERENCES models(id) ON DELETE CASCADE
+                )
+            ''')
+            
+            # Migrate databases created before models.realized_pnl existed and
+            # seed the counter from the trade history. The ALTER and the backfill
+            # share one transaction so a failed start can't leave the column at 0.
+            conn.commit()
+            cursor.execute('BEGIN')
+            try:
+                cursor.execute('ALTER TABLE models ADD COLUMN realized_pnl REAL DEFAULT 0')
+                cursor.execute('''
+                    UPDATE models SET realized_pnl = (
+                        SELECT COALESCE(SUM(pnl), 0) FROM trades WHERE model_id = models.id
+                    )
+                ''')
+                conn.commit()
+            except sqlite3.OperationalError as e:
+                conn.rollback()
+                if 'duplicate column' not in str(e):
+                    raise
+            
+            # Indexes for per-model history lookups. Entries are ordered by
+            # (model_id, rowid), so ORDER BY id DESC needs no sort step.
+            for table in ('trades', 'conversations', 'account_values'):
+                cursor.execute(f'CREATE INDEX IF NOT EXISTS idx_{table}_model ON {table}(model_id)')
+            # portfolios needs no extra index: UNIQUE(model_id, coin, side) already
+            # provides one with model_id as its leading column
+            
+            conn.commit()
+            
+            # Refresh planner statistics once per start so index choices track
+            # table growth; it is a single pass over each index
+            cursor.execute('ANALYZE')
+        finally:
+            self.release_connection(conn)
     
     # ============ Model Management ============
     
@@ -102,45 +280,101 @@ class Database:
                    model_name: str, initial_capital: float = 10000) -> int:
         """Add new trading model"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO models (name, api_key, api_url, model_name, initial_capital)
-            VALUES (?, ?, ?, ?, ?)
-        ''', (name, api_key, api_url, model_name, initial_capital))
-        model_id = cursor.lastrowid
-        conn.commit()
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_ADD_MODEL, (name, api_key, api_url, model_name, initial_capital))
+            model_id = cursor.lastrowid
+            conn.commit()
+        finally:
+            self.release_connection(conn)
+        self._invalidate_model(model_id)
         return model_id
     
     def get_model(self, model_id: int) -> Optional[Dict]:
         """Get model information"""
+        with self._model_cache_lock:
+            model = self._model_cache.get(model_id)
+            generation = self._model_generation.get(model_id, 0)
+        if model is not None:
+            return dict(model)
+        
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM models WHERE id = ?', (model_id,))
-        row = cursor.fetchone()
-        conn.close()
-        return dict(row) if row else None
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_GET_MODEL, (model_id,))
+            row = cursor.fetchone()
+        finally:
+            self.release_connection(conn)
+        if not row:
+            return None
+        
+        model = dict(row)
+        with self._model_cache_lock:
+            if self._model_generation.get(model_id, 0) == generation:
+                self._model_cache[model_id] = model
+        return dict(model)
+    
+    def _invalidate_model(self, model_id: int):
+        """Drop cached model row"""
+        with self._model_cache_lock:
+            self._model_cache.pop(model_id, None)
+            self._model_generation[model_id] = self._model_generation.get(model_id, 0) + 1
     
     def get_all_models(self) -> List[Dict]:
         """Get all trading models"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM models ORDER BY created_at DESC')
-        rows = cursor.fetchall()
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_GET_ALL_MODELS)
+            rows = cursor.fetchall()
+        finally:
+            self.release_connection(conn)
         return [dict(row) for row in rows]
     
+    def update_model(self, model_id: int, name: str = None, api_key: str = None,
+                     api_url: str = None, model_name: str = None,
+                     initial_capital: float = None) -> bool:
+        """Update model fields that are not None
+        
+        Returns:
+            True if the model exists
+        """
+        values = (name, api_key, api_url, model_name, initial_capital)
+        updates = {col: val for col, val in zip(_MODEL_UPDATE_COLUMNS, values) if val is not None}
+        if not updates:
+            return self.get_model(model_id) is not None
+        
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            # RETURNING tells whether the row exists without a second query
+            cursor.execute(
+                f"UPDATE models SET {', '.join(col + ' = ?' for col in updates)} "
+                f"WHERE id = ? RETURNING id",
+                (*updates.values(), model_id)
+            )
+            updated = cursor.fetchone() is not None
+            conn.commit()
+        finally:
+            self.release_connection(conn)
+        self._invalidate_model(model_id)
+        return updated
+    
     def delete_model(self, model_id: int):
         """Delete model and related data"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM models WHERE id = ?', (model_id,))
-        cursor.execute('DELETE FROM portfolios WHERE model_id = ?', (model_id,))
-        cursor.execute('DELETE FROM trades WHERE model_id = ?', (model_id,))
-        cursor.execute('DELETE FROM conversations WHERE model_id = ?', (model_id,))
-        cursor.execute('DELETE FROM account_values WHERE model_id = ?', (model_id,))
-        conn.commit()
-        conn.close()
+        try:
+            # Take the write lock up front so readers never see a half-deleted model
+            conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.cursor()
+            # Children first, foreign keys are enforced. New databases cascade
+            # from models, but tables created before ON DELETE CASCADE don't.
+            for sql in _SQL_DELETE_MODEL:
+                cursor.execute(sql, (model_id,))
+            conn.commit()
+        finally:
+            self.release_connection(conn)
+        self._invalidate_model(model_id)
     
     # ============ Portfolio Management ============
     
@@ -148,18 +382,12 @@ class Database:
                        avg_price: float, leverage: int = 1, side: str = 'long'):
         """Update position"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO portfolios (model_id, coin, quantity, avg_price, leverage, side, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            ON CONFLICT(model_id, coin, side) DO UPDATE SET
-                quantity = excluded.quantity,
-                avg_price = excluded.avg_price,
-                leverage = excluded.leverage,
-                updated_at = CURRENT_TIMESTAMP
-        ''', (model_id, coin, quantity, avg_price, leverage, side))
-        conn.commit()
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_UPDATE_POSITION, (model_id, coin, quantity, avg_price, leverage, side))
+            conn.commit()
+        finally:
+            self.release_connection(conn)
     
     def get_portfolio(self, model_id: int, current_prices: Dict = None) -> Dict:
         """Get portfolio with positions and P&L
@@ -169,67 +397,31 @@ class Database:
             current_prices: Current market prices {coin: price} for unrealized P&L calculation
         """
         conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Get positions
-        cursor.execute('''
-            SELECT * FROM portfolios WHERE model_id = ? AND quantity > 0
-        ''', (model_id,))
-        positions = [dict(row) for row in cursor.fetchall()]
-        
-        # Get initial capital
-        cursor.execute('SELECT initial_capital FROM models WHERE id = ?', (model_id,))
-        initial_capital = cursor.fetchone()['initial_capital']
+        try:
+            cursor = conn.cursor()
+            
+            # Get positions
+            cursor.execute(_SQL_GET_POSITIONS, (model_id,))
+            positions = [dict(row) for row in cursor.fetchall()]
+            
+            # Get initial capital and realized P&L (sum of all trade P&L)
+            cursor.execute(_SQL_GET_CAPITAL_AND_REALIZED_PNL, (model_id,))
+            row = cursor.fetchone()
+            initial_capital = row['initial_capital']
+            realized_pnl = row['total_pnl']
+        finally:
+            self.release_connection(conn)
         
-        # Calculate realized P&L (sum of all trade P&L)
-        cursor.execute('''
-            SELECT COALESCE(SUM(pnl), 0) as total_pnl FROM trades WHERE model_id = ?
-        ''', (model_id,))
-        realized_pnl = cursor.fetchone()['total_pnl']
-        
-        # Calculate margin used
-        margin_used = sum([p['quantity'] * p['avg_price'] / p['leverage'] for p in positions])
-        
-        # Calculate unrealized P&L (if prices provided)
-        unrealized_pnl = 0
-        if current_prices:
-            for pos in positions:
-                coin = pos['coin']
-                if coin in current_prices:
-                    current_price = current_prices[coin]
-                    entry_price = pos['avg_price']
-                    quantity = pos['quantity']
-                    
-                    # Add current price to position
-                    pos['current_price'] = current_price
-                    
-                    # Calculate position P&L
-                    if pos['side'] == 'long':
-                        pos_pnl = (current_price - entry_price) * quantity
-                    else:  # short
-                        pos_pnl = (entry_price - current_price) * quantity
-                    
-                    pos['pnl'] = pos_pnl
-                    unrealized_pnl += pos_pnl
-                else:
-                    pos['current_price'] = None
-                    pos['pnl'] = 0
-        else:
-            for pos in positions:
-                pos['current_price'] = None
-                pos['pnl'] = 0
+        margin_used, positions_value, unrealized_pnl = self._calculate_positions(
+            positions, current_prices
+        )
         
         # Cash = initial capital + realized P&L - margin used
         cash = initial_capital + realized_pnl - margin_used
         
-        # Position value = quantity * entry price (not margin!)
-        positions_value = sum([p['quantity'] * p['avg_price'] for p in positions])
-        
         # Total account value = initial capital + realized P&L + unrealized P&L
         total_value = initial_capital + realized_pnl + unrealized_pnl
         
-        conn.close()
-        
         return {
             'model_id': model_id,
             'cash': cash,
@@ -241,15 +433,80 @@ class Database:
             'unrealized_pnl': unrealized_pnl
         }
     
+    def _calculate_positions(self, positions: List[Dict], current_prices: Dict = None):
+        """Fill in current price and P&L for each position
+        
+        Returns:
+            (margin_used, positions_value, unrealized_pnl)
+        """
+        if not positions:
+            return 0.0, 0.0, 0.0
+        
+        prices = current_prices or {}
+        n = len(positions)
+        quantity = np.fromiter((p['quantity'] for p in positions), np.float64, n)
+        entry_price = np.fromiter((p['avg_price'] for p in positions), np.float64, n)
+        leverage = np.fromiter((p['leverage'] for p in positions), np.float64, n)
+        is_long = np.fromiter((p['side'] == 'long' for p in positions), np.bool_, n)
+        # NaN marks coins without a current price; they contribute no P&L
+        current_price = np.fromiter(
+            (prices.get(p['coin'], np.nan) for p in positions), np.float64, n
+        )
+        
+        margin_used, positions_value, pos_pnl = calculate_position_pnl(
+            quantity, entry_price, leverage, current_price, is_long
+        )
+        unrealized_pnl = float(pos_pnl.sum())
+        has_price = ~np.isnan(current_price)
+        
+        for pos, priced, price, pnl in zip(positions, has_price.tolist(),
+                                           current_price.tolist(), pos_pnl.tolist()):
+            pos['current_price'] = price if priced else None
+            pos['pnl'] = pnl
+        
+        return float(margin_used), float(positions_value), unrealized_pnl
+    
+    def get_leaderboard_rows(self, current_prices: Dict = None) -> List[Dict]:
+        """Get account value of every model in two queries
+        
+        Args:
+            current_prices: Current market prices {coin: price} for unrealized P&L calculation
+        """
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_GET_LEADERBOARD_MODELS)
+            models = [dict(row) for row in cursor.fetchall()]
+            
+            cursor.execute(_SQL_GET_OPEN_POSITIONS)
+            positions_by_model = {
+                model_id: list(rows)
+                for model_id, rows in groupby(
+                    (dict(row) for row in cursor.fetchall()),
+                    key=itemgetter('model_id')
+                )
+            }
+        finally:
+            self.release_connection(conn)
+        
+        for model in models:
+            _, _, unrealized_pnl = self._calculate_positions(
+                positions_by_model.get(model['id'], []), current_prices
+            )
+            model['unrealized_pnl'] = unrealized_pnl
+            model['total_value'] = model['initial_capital'] + model['realized_pnl'] + unrealized_pnl
+        
+        return models
+    
     def close_position(self, model_id: int, coin: str, side: str = 'long'):
         """Close position"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            DELETE FROM portfolios WHERE model_id = ? AND coin = ? AND side = ?
-        ''', (model_id, coin, side))
-        conn.commit()
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_CLOSE_POSITION, (model_id, coin, side))
+            conn.commit()
+        finally:
+            self.release_connection(conn)
     
     # ============ Trade Records ============
     
@@ -257,24 +514,27 @@ class Database:
                   price: float, leverage: int = 1, side: str = 'long', pnl: float = 0):
         """Add trade record"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO trades (model_id, coin, signal, quantity, price, leverage, side, pnl)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-        ''', (model_id, coin, signal, quantity, price, leverage, side, pnl))
-        conn.commit()
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_ADD_TRADE, (model_id, coin, signal, quantity, price, leverage, side, pnl))
+            # Keep the realized P&L counter in the same transaction as the trade
+            if pnl:
+                cursor.execute(_SQL_ADD_REALIZED_PNL, (pnl, model_id))
+            conn.commit()
+        finally:
+            self.release_connection(conn)
+        if pnl:
+            self._invalidate_model(model_id)
     
     def get_trades(self, model_id: int, limit: int = 50) -> List[Dict]:
         """Get trade history"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM trades WHERE model_id = ?
-            ORDER BY timestamp DESC LIMIT ?
-        ''', (model_id, limit))
-        rows = cursor.fetchall()
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_GET_TRADES, (model_id, limit))
+            rows = cursor.fetchall()
+        finally:
+            self.release_connection(conn)
         return [dict(row) for row in rows]
     
     # ============ Conversation History ============
@@ -283,24 +543,32 @@ class Database:
                         ai_response: str, cot_trace: str = ''):
         """Add conversation record"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO conversations (model_id, user_prompt, ai_response, cot_trace)
-            VALUES (?, ?, ?, ?)
-        ''', (model_id, user_prompt, ai_response, cot_trace))
-        conn.commit()
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_ADD_CONVERSATION, (model_id, user_prompt, ai_response, cot_trace))
+            conn.commit()
+        finally:
+            self.release_connection(conn)
     
-    def get_conversations(self, model_id: int, limit: int = 20) -> List[Dict]:
-        """Get conversation history"""
+    def get_conversations(self, model_id: int, limit: int = 20, full: bool = False) -> List[Dict]:
+        """Get conversation history
+        
+        Args:
+            model_id: Model ID
+            limit: Max number of records
+            full: Include the complete prompt, response and CoT trace; otherwise
+                only the first 500 characters of the response are returned
+        """
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM conversations WHERE model_id = ?
-            ORDER BY timestamp DESC LIMIT ?
-        ''', (model_id, limit))
-        rows = cursor.fetchall()
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            if full:
+                cursor.execute(_SQL_GET_CONVERSATIONS_FULL, (model_id, limit))
+            else:
+                cursor.execute(_SQL_GET_CONVERSATIONS_SUMMARY, (model_id, limit))
+            rows = cursor.fetchall()
+        finally:
+            self.release_connection(conn)
         return [dict(row) for row in rows]
     
     # ============ Account Value History ============
@@ -309,23 +577,37 @@ class Database:
                             cash: float, positions_value: float):
         """Record account value snapshot"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO account_values (model_id, total_value, cash, positions_value)
-            VALUES (?, ?, ?, ?)
-        ''', (model_id, total_value, cash, positions_value))
-        conn.commit()
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_RECORD_ACCOUNT_VALUE, (model_id, total_value, cash, positions_value))
+            conn.commit()
+        finally:
+            self.release_connection(conn)
+    
+    def record_account_values(self, rows: List[tuple]):
+        """Record account value snapshots for several models in one transaction
+        
+        Args:
+            rows: (model_id, total_value, cash, positions_value) tuples
+        """
+        if not rows:
+            return
+        conn = self.get_connection()
+        try:
+            cursor = conn.cursor()
+            cursor.executemany(_SQL_RECORD_ACCOUNT_VALUE, rows)
+            conn.commit()
+        finally:
+            self.release_connection(conn)
     
     def get_account_value_history(self, model_id: int, limit: int = 100) -> List[Dict]:
         """Get account value history"""
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT * FROM account_values WHERE model_id = ?
-            ORDER BY timestamp DESC LIMIT ?
-        ''', (model_id, limit))
-        rows = cursor.fetchall()
-        conn.close()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(_SQL_GET_ACCOUNT_VALUE_HISTORY, (model_id, limit))
+            rows = cursor.fetchall()
+        finally:
+            self.release_connection(conn)
         return [dict(row) for row in rows]
 
@@ -1,14 +1,21 @@
 """
 Market data module - Binance API integration
 """
+import logging
 import requests
+import threading
 import time
-from typing import Dict, List
+from typing import Dict, List, Optional
+
+logger = logging.getLogger('trading')
 
 class MarketDataFetcher:
     """Fetch real-time market data from Binance API"""
     
-    def __init__(self):
+    def __init__(self, session: requests.Session = None):
+        # Shared HTTP session keeps TCP/TLS connections alive between fetches
+        self.session = session or requests.Session()
+        
         self.binance_base_url = "https://api.binance.com/api/v3"
         self.coingecko_base_url = "https://api.coingecko.com/api/v3"
         
@@ -35,6 +42,11 @@ class MarketDataFetcher:
         self._cache = {}
         self._cache_time = {}
         self._cache_duration = 5  # Cache for 5 seconds
+        self._price_lock = threading.Lock()
+    
+    def close(self):
+        """Close the HTTP session"""
+        self.session.close()
     
     def get_current_prices(self, coins: List[str]) -> Dict[str, float]:
         """Get current prices from Binance API"""
@@ -44,53 +56,68 @@ class MarketDataFetcher:
             if time.time() - self._cache_time[cache_key] < self._cache_duration:
                 return self._cache[cache_key]
         
-        prices = {}
-        
-        try:
-            # Batch fetch Binance 24h ticker data
-            symbols = [self.binance_symbols.get(coin) for coin in coins if coin in self.binance_symbols]
+        # Single flight: concurrent callers wait for one upstream request
+        with self._price_lock:
+            if cache_key in self._cache:
+                if time.time() - self._cache_time[cache_key] < self._cache_duration:
+                    return self._cache[cache_key]
+            
+            prices = {}
             
-            if symbols:
-                # Build symbols parameter
-                symbols_param = '[' + ','.join([f'"{s}"' for s in symbols]) + ']'
+            try:
+                # Batch fetch Binance 24h ticker data
+                symbols = [self.binance_symbols.get(coin) for coin in coins if coin in self.binance_symbols]
                 
-                response = requests.get(
-                    f"{self.binance_base_url}/ticker/24hr",
-                    params={'symbols': symbols_param},
-                    timeout=5
-                )
-                response.raise_for_status()
-                data = response.json()
+                if symbols:
+                    # Build symbols parameter
+                    symbols_param = '[' + ','.join([f'"{s}"' for s in symbols]) + ']'
+                    
+                    response = self.session.get(
+                        f"{self.binance_base_url}/ticker/24hr",
+                        params={'symbols': symbols_param},
+                        timeout=5
+                    )
+                    response.raise_for_status()
+                    data = response.json()
+                    
+                    # Parse data
+                    for item in data:
+                        symbol = item['symbol']
+                        # Find corresponding coin
+                        for coin, binance_symbol in self.binance_symbols.items():
+                            if binance_symbol == symbol:
+                                prices[coin] = {
+                                    'price': float(item['lastPrice']),
+                                    'change_24h': float(item['priceChangePercent'])
+                                }
+                                break
                 
-                # Parse data
-                for item in data:
-                    symbol = item['symbol']
-                    # Find corresponding coin
-                    for coin, binance_symbol in self.binance_symbols.items():
-                        if binance_symbol == symbol:
-                            prices[coin] = {
-                                'price': float(item['lastPrice']),
-                                'change_24h': float(item['priceChangePercent'])
-                            }
-                            break
-            
-            # Update cache
-            self._cache[cache_key] = prices
-            self._cache_time[cache_key] = time.time()
-            
-            return prices
-            
-        except Exception as e:
-            print(f"[ERROR] Binance API failed: {e}")
-            # Fallback to CoinGecko
-            return self._get_prices_from_coingecko(coins)
+                # Update cache
+                self._cache[cache_key] = prices
+                self._cache_time[cache_key] = time.time()
+                
+                return prices
+                
+            except Exception as e:
+                logger.error(f"[ERROR] Binance API failed: {e}")
+                # Fallback to CoinGecko, cached like Binance so waiting callers
+                # don't repeat both requests
+                prices = self._get_prices_from_coingecko(coins)
+                if prices is None:
+                    # Both sources failed; never cache the placeholder prices
+                    return {coin: {'price': 0, 'change_24h': 0} for coin in coins}
+                
+                self._cache[cache_key] = prices
+                self._cache_time[cache_key] = time.time()
+                
+                return prices
     
-    def _get_prices_from_coingecko(self, coins: List[str]) -> Dict[str, float]:
-        """Fallback: Fetch prices from CoinGecko"""
+    def _get_prices_from_coingecko(self, coins: List[str]) -> Optional[Dict[str, float]]:
+        """Fallback: Fetch prices from CoinGecko, None if the request fails"""
         try:
             coin_ids = [self.coingecko_mapping.get(coin, coin.lower()) for coin in coins]
             
-            response = requests.get(
+            response = self.session.get(
                 f"{self.coingecko_base_url}/simple/price",
                 params={
                     'ids': ','.join(coin_ids),
@@ -113,15 +140,15 @@ class MarketDataFetcher:
             
             return prices
         except Exception as e:
-            print(f"[ERROR] CoinGecko fallback also failed: {e}")
-            return {coin: {'price': 0, 'change_24h': 0} for coin in coins}
+            logger.error(f"[ERROR] CoinGecko fallback also failed: {e}")
+            return None
     
     def get_market_data(self, coin: str) -> Dict:
         """Get detailed market data from CoinGecko"""
         coin_id = self.coingecko_mapping.get(coin, coin.lower())
         
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.coingecko_base_url}/coins/{coin_id}",
                 params={'localization': 'false', 'tickers': 'false', 'community_data': 'false'},
                 timeout=10
@@ -141,7 +168,7 @@ class MarketDataFetcher:
                 'low_24h': market_data.get('low_24h', {}).get('usd', 0),
             }
         except Exception as e:
-            print(f"[ERROR] Failed to get market data for {coin}: {e}")
+            logger.error(f"[ERROR] Failed to get market data for {coin}: {e}")
             return {}
     
     def get_historical_prices(self, coin: str, days: int = 7) -> List[Dict]:
@@ -149,7 +176,7 @@ class MarketDataFetcher:
         coin_id = self.coingecko_mapping.get(coin, coin.lower())
         
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.coingecko_base_url}/coins/{coin_id}/market_chart",
                 params={'vs_currency': 'usd', 'days': days},
                 timeout=10
@@ -166,7 +193,7 @@ class MarketDataFetcher:
             
             return prices
         except Exception as e:
-            print(f"[ERROR] Failed to get historical prices for {coin}: {e}")
+            logger.error(f"[ERROR] Failed to get historical prices for {coin}: {e}")
             return []
     
     def calculate_technical_indicators(self, coin: str) -> Dict:
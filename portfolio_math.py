@@ -0,0 +1,43 @@
+"""
+Portfolio math kernels - compiled with Numba when available
+"""
+import numpy as np
+
+try:
+    from numba import njit
+except ImportError:  # Numba is optional, fall back to plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True)
+def calculate_position_pnl(quantity, entry_price, leverage, current_price, is_long):
+    """Compute margin, position value and per-position unrealized P&L
+
+    Args:
+        quantity, entry_price, leverage, current_price: float64 arrays, one item per position
+            (current_price is NaN when the coin has no market price)
+        is_long: bool array, True for long positions
+
+    Returns:
+        (margin_used, positions_value, pnl) where pnl is a float64 array
+    """
+    n = quantity.shape[0]
+    pnl = np.zeros(n)
+    margin_used = 0.0
+    positions_value = 0.0
+
+    for i in range(n):
+        value = quantity[i] * entry_price[i]
+        positions_value += value
+        margin_used += value / leverage[i]
+
+        if not np.isnan(current_price[i]):
+            if is_long[i]:
+                pnl[i] = (current_price[i] - entry_price[i]) * quantity[i]
+            else:
+                pnl[i] = (entry_price[i] - current_price[i]) * quantity[i]
+
+    return margin_used, positions_value, pnl
@@ -0,0 +1,130 @@
+import time
+
+import pytest
+
+import app as app_module
+
+
+class FakeEngine:
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+
+    def execute_trading_cycle(self, record_account_value=True):
+        if self.error:
+            raise self.error
+        return self.result
+
+
+@pytest.fixture(scope='module', autouse=True)
+def job_workers():
+    app_module.start_job_workers()
+
+
+@pytest.fixture
+def client(db, monkeypatch):
+    monkeypatch.setattr(app_module, 'db', db)
+    monkeypatch.setattr(app_module, 'trading_engines', {})
+    return app_module.app.test_client()
+
+
+def wait_for_job(client, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        state = client.get(f'/api/jobs/{job_id}').get_json()
+        if state['status'] in ('done', 'error'):
+            return state
+        time.sleep(0.01)
+    raise AssertionError(f'Job {job_id} did not finish')
+
+
+def test_execute_returns_job_and_result(client):
+    app_module.trading_engines[1] = FakeEngine(result={'success': True, 'executions': []})
+
+    response = client.post('/api/models/1/execute')
+    assert response.status_code == 202
+    job_id = response.get_json()['job_id']
+
+    state = wait_for_job(client, job_id)
+    assert state['status'] == 'done'
+    assert state['model_id'] == 1
+    assert state['result'] == {'success': True, 'executions': []}
+
+
+def test_execute_job_error(client):
+    app_module.trading_engines[2] = FakeEngine(error=RuntimeError('boom'))
+
+    job_id = client.post('/api/models/2/execute').get_json()['job_id']
+
+    state = wait_for_job(client, job_id)
+    assert state['status'] == 'error'
+    assert state['error'] == 'boom'
+
+
+def test_execute_unknown_model(client):
+    assert client.post('/api/models/999/execute').status_code == 404
+
+
+def test_unknown_job(client):
+    assert client.get('/api/jobs/missing').status_code == 404
+
+
+@pytest.mark.parametrize('initial_capital', ['abc', 0, -100])
+def test_update_model_rejects_bad_capital(client, db, initial_capital):
+    model_id = db.add_model('m', 'key', 'url', 'gpt', 1000)
+
+    response = client.put(f'/api/models/{model_id}', json={'initial_capital': initial_capital})
+
+    assert response.status_code == 400
+    assert db.get_model(model_id)['initial_capital'] == 1000
+
+
+@pytest.mark.parametrize('body', [[1, 2], 'name', 42])
+def test_update_model_rejects_non_object_body(client, db, body):
+    model_id = db.add_model('m', 'key', 'url', 'gpt')
+
+    assert client.put(f'/api/models/{model_id}', json=body).status_code == 400
+
+
+@pytest.mark.parametrize('field', ['name', 'api_key', 'api_url', 'model_name'])
+@pytest.mark.parametrize('value', ['', '   ', 123])
+def test_update_model_rejects_blank_fields(client, db, field, value):
+    model_id = db.add_model('m', 'key', 'url', 'gpt')
+
+    response = client.put(f'/api/models/{model_id}', json={field: value})
+
+    assert response.status_code == 400
+    assert db.get_model(model_id)[field] == {'name': 'm', 'api_key': 'key',
+                                             'api_url': 'url', 'model_name': 'gpt'}[field]
+
+
+def test_update_model_deleted_concurrently(client, db, monkeypatch):
+    model_id = db.add_model('m', 'key', 'url', 'gpt')
+    monkeypatch.setattr(db, 'get_model', lambda model_id: None)
+
+    response = client.put(f'/api/models/{model_id}', json={'name': 'renamed'})
+
+    assert response.status_code == 404
+    assert model_id not in app_module.trading_engines
+
+
+def test_update_model_rebuilds_engine(client, db):
+    model_id = db.add_model('m', 'key', 'url', 'gpt')
+
+    response = client.put(f'/api/models/{model_id}', json={'name': 'renamed'})
+
+    assert response.status_code == 200
+    assert db.get_model(model_id)['name'] == 'renamed'
+    assert model_id in app_module.trading_engines
+
+
+def test_conversations_summary_flag(client, db):
+    model_id = db.add_model('m', 'key', 'url', 'gpt')
+    db.add_conversation(model_id, 'prompt', 'y' * 600)
+
+    full = client.get(f'/api/models/{model_id}/conversations').get_json()
+    summary = client.get(f'/api/models/{model_id}/conversations?summary=1').get_json()
+
+    assert full[0]['ai_response'] == 'y' * 600
+    assert summary[0]['ai_response_preview'] == 'y' * 500
+    assert 'ai_response' not in summary[0]
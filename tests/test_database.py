@@ -0,0 +1,195 @@
+import sqlite3
+
+from database import Database
+
+
+def test_add_trade_updates_realized_pnl(db):
+    model_id = db.add_model('m', 'key', 'url', 'gpt', 1000)
+
+    db.add_trade(model_id, 'BTC', 'buy_to_enter', 1, 100)
+    db.add_trade(model_id, 'BTC', 'close_position', 1, 110, pnl=10)
+    db.add_trade(model_id, 'ETH', 'close_position', 1, 90, side='short', pnl=-2.5)
+
+    assert db.get_model(model_id)['realized_pnl'] == 7.5
+    portfolio = db.get_portfolio(model_id)
+    assert portfolio['realized_pnl'] == 7.5
+    assert portfolio['total_value'] == 1007.5
+
+
+def test_realized_pnl_migration_backfills_baseline_db(tmp_path):
+    path = str(tmp_path / 'baseline.db')
+    # Schema as created before models.realized_pnl existed
+    conn = sqlite3.connect(path)
+    conn.executescript('''
+        CREATE TABLE models (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            api_key TEXT NOT NULL,
+            api_url TEXT NOT NULL,
+            model_name TEXT NOT NULL,
+            initial_capital REAL DEFAULT 10000,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+        CREATE TABLE trades (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            model_id INTEGER NOT NULL,
+            coin TEXT NOT NULL,
+            signal TEXT NOT NULL,
+            quantity REAL NOT NULL,
+            price REAL NOT NULL,
+            leverage INTEGER DEFAULT 1,
+            side TEXT DEFAULT 'long',
+            pnl REAL DEFAULT 0,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (model_id) REFERENCES models(id)
+        );
+        INSERT INTO models (name, api_key, api_url, model_name) VALUES ('a', 'k', 'u', 'm');
+        INSERT INTO models (name, api_key, api_url, model_name) VALUES ('b', 'k', 'u', 'm');
+        INSERT INTO trades (model_id, coin, signal, quantity, price, pnl)
+            VALUES (1, 'BTC', 'close_position', 1, 100, 4), (1, 'ETH', 'close_position', 1, 100, 3);
+    ''')
+    conn.close()
+
+    db = Database(path)
+    db.init_db()
+    # A second start must not reset or double-count the counter
+    db.init_db()
+
+    assert db.get_model(1)['realized_pnl'] == 7
+    assert db.get_model(2)['realized_pnl'] == 0
+
+    db.add_trade(1, 'BTC', 'close_position', 1, 100, pnl=1)
+    assert db.get_portfolio(1)['realized_pnl'] == 8
+    db.close_all()
+
+
+def test_update_model(db):
+    model_id = db.add_model('m', 'key', 'url', 'gpt', 1000)
+    db.get_model(model_id)  # populate the cache
+
+    assert db.update_model(model_id, name='renamed', initial_capital=500.0) is True
+    model = db.get_model(model_id)
+    assert model['name'] == 'renamed'
+    assert model['initial_capital'] == 500.0
+    assert model['api_key'] == 'key'
+
+
+def test_update_model_missing_row(db):
+    assert db.update_model(999, name='x') is False
+
+
+def test_update_model_empty_update(db):
+    model_id = db.add_model('m', 'key', 'url', 'gpt', 1000)
+
+    assert db.update_model(model_id) is True
+    assert db.update_model(999) is False
+    assert db.get_model(model_id)['name'] == 'm'
+
+
+def test_record_account_values(db):
+    first = db.add_model('a', 'key', 'url', 'gpt')
+    second = db.add_model('b', 'key', 'url', 'gpt')
+
+    db.record_account_values([
+        (first, 1100.0, 900.0, 200.0),
+        (second, 950.0, 950.0, 0.0),
+    ])
+    db.record_account_values([])
+
+    history = db.get_account_value_history(first)
+    assert len(history) == 1
+    assert history[0]['total_value'] == 1100.0
+    assert history[0]['cash'] == 900.0
+    assert history[0]['positions_value'] == 200.0
+    assert db.get_account_value_history(second)[0]['total_value'] == 950.0
+
+
+def test_delete_model_removes_cached_row(db):
+    model_id = db.add_model('m', 'key', 'url', 'gpt')
+    db.add_trade(model_id, 'BTC', 'buy_to_enter', 1, 100)
+    db.get_model(model_id)
+
+    db.delete_model(model_id)
+
+    assert db.get_model(model_id) is None
+    assert db.get_trades(model_id) == []
+
+
+def test_get_leaderboard_rows_groups_positions_per_model(db):
+    first = db.add_model('a', 'key', 'url', 'gpt', 1000)
+    second = db.add_model('b', 'key', 'url', 'gpt', 2000)
+    idle = db.add_model('c', 'key', 'url', 'gpt', 500)
+    db.update_position(first, 'BTC', 1, 100, 2, 'long')
+    db.update_position(second, 'ETH', 2, 50, 1, 'short')
+    db.update_position(first, 'ETH', 1, 40, 1, 'long')
+    db.add_trade(second, 'SOL', 'close_position', 1, 10, pnl=25)
+
+    rows = {row['id']: row for row in db.get_leaderboard_rows({'BTC': 110, 'ETH': 45})}
+
+    # first: long BTC +10, long ETH +5
+    assert rows[first]['unrealized_pnl'] == 15
+    assert rows[first]['total_value'] == 1015
+    # second: short ETH +10, plus realized 25
+    assert rows[second]['realized_pnl'] == 25
+    assert rows[second]['unrealized_pnl'] == 10
+    assert rows[second]['total_value'] == 2035
+    assert rows[idle]['total_value'] == 500
+
+
+def test_get_leaderboard_rows_matches_get_portfolio(db):
+    model_id = db.add_model('a', 'key', 'url', 'gpt', 1000)
+    db.update_position(model_id, 'BTC', 0.5, 100, 5, 'short')
+    prices = {'BTC': 90}
+
+    row = db.get_leaderboard_rows(prices)[0]
+
+    assert row['total_value'] == db.get_portfolio(model_id, prices)['total_value']
+
+
+def test_get_portfolio_position_pnl(db):
+    model_id = db.add_model('m', 'key', 'url', 'gpt', 10000)
+    db.update_position(model_id, 'BTC', 0.5, 60000, 10, 'long')
+    db.update_position(model_id, 'ETH', 2, 3000, 5, 'short')
+    db.update_position(model_id, 'SOL', 10, 150, 1, 'long')
+
+    portfolio = db.get_portfolio(model_id, {'BTC': 62000, 'ETH': 2900})
+    positions = {p['coin']: p for p in portfolio['positions']}
+
+    assert positions['BTC']['current_price'] == 62000
+    assert positions['BTC']['pnl'] == 1000
+    assert positions['ETH']['pnl'] == 200
+    # No market price: no P&L contribution
+    assert positions['SOL']['current_price'] is None
+    assert positions['SOL']['pnl'] == 0
+    assert portfolio['unrealized_pnl'] == 1200
+    assert portfolio['margin_used'] == 3000 + 1200 + 1500
+    assert portfolio['positions_value'] == 30000 + 6000 + 1500
+    assert portfolio['cash'] == 10000 - 5700
+    assert portfolio['total_value'] == 11200
+
+
+def test_get_portfolio_without_prices(db):
+    model_id = db.add_model('m', 'key', 'url', 'gpt', 1000)
+    db.update_position(model_id, 'BTC', 1, 100, 2, 'long')
+
+    portfolio = db.get_portfolio(model_id)
+
+    assert portfolio['positions'][0]['current_price'] is None
+    assert portfolio['positions'][0]['pnl'] == 0
+    assert portfolio['unrealized_pnl'] == 0
+    assert portfolio['margin_used'] == 50
+    assert portfolio['total_value'] == 1000
+
+
+def test_get_conversations_summary_and_full(db):
+    model_id = db.add_model('m', 'key', 'url', 'gpt')
+    db.add_conversation(model_id, 'prompt', 'x' * 800, cot_trace='trace')
+
+    summary = db.get_conversations(model_id)
+    assert set(summary[0]) == {'id', 'ai_response_preview', 'timestamp'}
+    assert summary[0]['ai_response_preview'] == 'x' * 500
+
+    full = db.get_conversations(model_id, full=True)
+    assert full[0]['ai_response'] == 'x' * 800
+    assert full[0]['user_prompt'] == 'prompt'
+    assert full[0]['cot_trace'] == 'trace'
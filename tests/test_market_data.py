@@ -0,0 +1,80 @@
+import threading
+import time
+
+import requests
+
+from market_data import MarketDataFetcher
+
+
+class FakeResponse:
+    def __init__(self, data):
+        self.data = data
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.data
+
+
+class FakeSession:
+    """Stands in for requests.Session; counts calls per upstream"""
+
+    def __init__(self, binance_ok=True, coingecko_ok=True, delay=0.05):
+        self.binance_ok = binance_ok
+        self.coingecko_ok = coingecko_ok
+        self.delay = delay
+        self.calls = {'binance': 0, 'coingecko': 0}
+        self.lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        source = 'binance' if 'binance' in url else 'coingecko'
+        with self.lock:
+            self.calls[source] += 1
+        time.sleep(self.delay)
+        if source == 'binance':
+            if not self.binance_ok:
+                raise requests.HTTPError('451 Client Error')
+            return FakeResponse([{'symbol': 'BTCUSDT', 'lastPrice': '60000', 'priceChangePercent': '1.5'}])
+        if not self.coingecko_ok:
+            raise requests.HTTPError('429 Client Error')
+        return FakeResponse({'bitcoin': {'usd': 59900, 'usd_24h_change': 1.4}})
+
+
+def fetch_concurrently(fetcher, callers=6):
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(fetcher.get_current_prices(['BTC'])))
+        for _ in range(callers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_callers_share_one_binance_request():
+    session = FakeSession()
+    results = fetch_concurrently(MarketDataFetcher(session=session))
+
+    assert session.calls == {'binance': 1, 'coingecko': 0}
+    assert all(r['BTC']['price'] == 60000 for r in results)
+
+
+def test_coingecko_fallback_is_cached_for_concurrent_callers():
+    session = FakeSession(binance_ok=False)
+    results = fetch_concurrently(MarketDataFetcher(session=session))
+
+    assert session.calls == {'binance': 1, 'coingecko': 1}
+    assert all(r['BTC']['price'] == 59900 for r in results)
+
+
+def test_failed_fallback_is_not_cached():
+    session = FakeSession(binance_ok=False, coingecko_ok=False, delay=0)
+    fetcher = MarketDataFetcher(session=session)
+
+    assert fetcher.get_current_prices(['BTC']) == {'BTC': {'price': 0, 'change_24h': 0}}
+
+    session.binance_ok = True
+    assert fetcher.get_current_prices(['BTC'])['BTC']['price'] == 60000
@@ -0,0 +1,59 @@
+import math
+
+import numpy as np
+import pytest
+
+from portfolio_math import calculate_position_pnl
+
+
+def reference_pnl(positions, current_prices):
+    """Original pure-Python get_portfolio math"""
+    margin_used = sum([p['quantity'] * p['avg_price'] / p['leverage'] for p in positions])
+    positions_value = sum([p['quantity'] * p['avg_price'] for p in positions])
+    pnl = []
+    for pos in positions:
+        if pos['coin'] in current_prices:
+            current_price = current_prices[pos['coin']]
+            if pos['side'] == 'long':
+                pnl.append((current_price - pos['avg_price']) * pos['quantity'])
+            else:
+                pnl.append((pos['avg_price'] - current_price) * pos['quantity'])
+        else:
+            pnl.append(0)
+    return margin_used, positions_value, pnl
+
+
+def run_kernel(positions, current_prices):
+    return calculate_position_pnl(
+        np.array([p['quantity'] for p in positions], dtype=np.float64),
+        np.array([p['avg_price'] for p in positions], dtype=np.float64),
+        np.array([p['leverage'] for p in positions], dtype=np.float64),
+        np.array([current_prices.get(p['coin'], np.nan) for p in positions], dtype=np.float64),
+        np.array([p['side'] == 'long' for p in positions], dtype=np.bool_),
+    )
+
+
+POSITIONS = [
+    {'coin': 'BTC', 'quantity': 0.5, 'avg_price': 60000.0, 'leverage': 10, 'side': 'long'},
+    {'coin': 'ETH', 'quantity': 2.0, 'avg_price': 3000.0, 'leverage': 5, 'side': 'short'},
+    {'coin': 'SOL', 'quantity': 10.0, 'avg_price': 150.0, 'leverage': 1, 'side': 'long'},
+]
+
+
+@pytest.mark.parametrize('current_prices', [
+    {'BTC': 62000.0, 'ETH': 2900.0, 'SOL': 140.0},
+    {'BTC': 58000.0, 'ETH': 3100.0},  # SOL has no price
+    {},
+])
+def test_matches_reference(current_prices):
+    margin_used, positions_value, pnl = run_kernel(POSITIONS, current_prices)
+    ref_margin, ref_value, ref_pnl = reference_pnl(POSITIONS, current_prices)
+
+    assert math.isclose(margin_used, ref_margin)
+    assert math.isclose(positions_value, ref_value)
+    assert pnl.tolist() == pytest.approx(ref_pnl)
+
+
+def test_long_and_short_signs():
+    _, _, pnl = run_kernel(POSITIONS[:2], {'BTC': 61000.0, 'ETH': 2950.0})
+    assert pnl.tolist() == pytest.approx([500.0, 100.0])
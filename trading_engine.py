@@ -1,6 +1,9 @@
 from datetime import datetime
 from typing import Dict
 import json
+import logging
+
+logger = logging.getLogger('trading')
 
 class TradingEngine:
     def __init__(self, model_id: int, db, market_fetcher, ai_trader):
@@ -10,7 +13,13 @@ class TradingEngine:
         self.ai_trader = ai_trader
         self.coins = ['BTC', 'ETH', 'SOL', 'BNB', 'XRP', 'DOGE']
     
-    def execute_trading_cycle(self) -> Dict:
+    def execute_trading_cycle(self, record_account_value: bool = True) -> Dict:
+        """Run one decision cycle
+        
+        Args:
+            record_account_value: Store the post-trade account value snapshot. Pass
+                False when the caller batches snapshots via db.record_account_values.
+        """
         try:
             market_state = self._get_market_state()
             
@@ -34,12 +43,13 @@ class TradingEngine:
             execution_results = self._execute_decisions(decisions, market_state, portfolio)
             
             updated_portfolio = self.db.get_portfolio(self.model_id, current_prices)
-            self.db.record_account_value(
-                self.model_id,
-                updated_portfolio['total_value'],
-                updated_portfolio['cash'],
-                updated_portfolio['positions_value']
-            )
+            if record_account_value:
+                self.db.record_account_value(
+                    self.model_id,
+                    updated_portfolio['total_value'],
+                    updated_portfolio['cash'],
+                    updated_portfolio['positions_value']
+                )
             
             return {
                 'success': True,
@@ -49,9 +59,7 @@ class TradingEngine:
             }
             
         except Exception as e:
-            print(f"[ERROR] Trading cycle failed (Model {self.model_id}): {e}")
-            import traceback
-            print(traceback.format_exc())
+            logger.exception(f"[ERROR] Trading cycle failed (Model {self.model_id}): {e}")
             return {
                 'success': False,
                 'error': str(e)